@@ -15,17 +15,40 @@ Design goals:
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 import os
+import threading
 import time
-from collections import defaultdict
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
 
 import serial  # pyserial
 import websockets
 
+from vehicle_state.clock import now_ms  # monotonic ms, shared time base
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback
+    orjson = None
+    import json
+
+
+# ----------------------------
+# JSON helpers (orjson when available)
+# ----------------------------
+if orjson is not None:
+    _loads = orjson.loads
+
+    def _dumps(obj: Any) -> str:
+        # Decode keeps text frames on the wire (bytes would go out as binary)
+        return orjson.dumps(obj).decode("utf-8")
+else:
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
 
 # ----------------------------
 # Logging
@@ -47,59 +70,155 @@ WS_PORT = int(os.getenv("VEHICLE_HUB_WS_PORT", "8765"))
 SERIAL_BAUD = int(os.getenv("VEHICLE_HUB_SERIAL_BAUD", "115200"))
 SERIAL_TIMEOUT_SEC = float(os.getenv("VEHICLE_HUB_SERIAL_TIMEOUT_SEC", "0.5"))
 
+# Parsed frames waiting for the event loop (oldest dropped beyond this)
+SERIAL_FRAME_QUEUE = int(os.getenv("VEHICLE_HUB_SERIAL_FRAME_QUEUE", "8"))
+
+# Partial line buffered between reads is dropped beyond this (junk guard)
+SERIAL_MAX_LINE_BYTES = int(os.getenv("VEHICLE_HUB_SERIAL_MAX_LINE_BYTES", "4096"))
+
 # How often we broadcast vehicle_state (Hz)
 BROADCAST_HZ = float(os.getenv("VEHICLE_HUB_BROADCAST_HZ", "10"))
 BROADCAST_INTERVAL = 1.0 / max(BROADCAST_HZ, 1.0)
 
+# Broadcast failures are logged at most once per this many seconds
+BROADCAST_WARN_INTERVAL = 5.0
+
 # How long without valid UNO frames until we mark stale
 STALE_AFTER_MS = int(os.getenv("VEHICLE_HUB_STALE_AFTER_MS", "750"))
 
+# How often the watchdog refreshes vehicle_state while data stays stale (sec)
+STALE_CHECK_INTERVAL = float(os.getenv("VEHICLE_HUB_STALE_CHECK_INTERVAL_SEC", "1.0"))
+
 # Prefer stable by-id path if present
 DEFAULT_BY_ID_GLOB = "/dev/serial/by-id"
 DEFAULT_FALLBACK_PORT = "/dev/ttyACM0"
 SERIAL_PORT = os.getenv("VEHICLE_HUB_SERIAL_PORT", "").strip()
 
 
-def _pick_serial_port() -> str:
+# Consecutive serial failures before the chosen port is re-scanned
+# (USB re-enumeration can change the by-id path)
+SERIAL_RESCAN_AFTER = int(os.getenv("VEHICLE_HUB_SERIAL_RESCAN_AFTER", "3"))
+
+_picked_port: Optional[str] = None
+
+
+def _scan_serial_port() -> str:
     if SERIAL_PORT:
         return SERIAL_PORT
 
     try:
-        if os.path.isdir(DEFAULT_BY_ID_GLOB):
-            entries = sorted(os.listdir(DEFAULT_BY_ID_GLOB))
-            for name in entries:
+        # Single pass, no list/sort: keep the lowest-sorting Arduino entry
+        # and the lowest-sorting entry overall
+        best_arduino: Optional[str] = None
+        first: Optional[str] = None
+        with os.scandir(DEFAULT_BY_ID_GLOB) as it:
+            for entry in it:
+                name = entry.name
+                if first is None or name < first:
+                    first = name
                 # Your Arduino shows up like: usb-Arduino__www.arduino.cc__0043_...-if00
                 if "Arduino" in name or "arduino" in name:
-                    path = os.path.join(DEFAULT_BY_ID_GLOB, name)
-                    return path
-            # if no Arduino match, still pick first entry (better than ttyACM0 in some cases)
-            if entries:
-                return os.path.join(DEFAULT_BY_ID_GLOB, entries[0])
+                    if best_arduino is None or name < best_arduino:
+                        best_arduino = name
+        if best_arduino is not None:
+            return os.path.join(DEFAULT_BY_ID_GLOB, best_arduino)
+        # if no Arduino match, still pick first entry (better than ttyACM0 in some cases)
+        if first is not None:
+            return os.path.join(DEFAULT_BY_ID_GLOB, first)
     except Exception:
         pass
 
     return DEFAULT_FALLBACK_PORT
 
 
-# ----------------------------
-# Time helper (monotonic ms)
-# ----------------------------
-START_TS = time.monotonic()
+def _pick_serial_port() -> str:
+    """Chosen serial port, scanned once and memoized until invalidated."""
+    global _picked_port
+    if _picked_port is None:
+        _picked_port = _scan_serial_port()
+    return _picked_port
 
 
-def now_ms() -> int:
-    return int((time.monotonic() - START_TS) * 1000)
+def _invalidate_serial_port() -> None:
+    global _picked_port
+    _picked_port = None
 
 
 # ----------------------------
 # VehicleState Builder (always complete schema)
 # ----------------------------
+# (section, key, UNO pin) for every digital output field
+_DIGITAL_MAP = (
+    ("indicators", "left", "D2"),
+    ("indicators", "right", "D3"),
+    ("indicators", "left_flashing", "D2"),
+    ("indicators", "right_flashing", "D3"),
+    ("indicators", "high_beam", "D4"),
+    ("warnings", "brake", "D5"),
+    ("warnings", "oil", "D6"),
+    ("warnings", "charge", "D7"),
+    ("warnings", "door", "D8"),
+    ("spares", "spare_1", "D9"),
+)
+
+# (analog key, UNO pin)
+_ANALOG_MAP = (
+    ("fuel_sender_raw", "A0"),
+    ("coolant_sender_raw", "A1"),
+    ("aux_analog_2", "A2"),
+    ("aux_analog_3", "A3"),
+    ("aux_analog_4", "A4"),
+    ("aux_analog_5", "A5"),
+)
+
+# norm for every 10-bit ADC reading, rounded once at import instead of per tick
+_NORM_LUT = tuple(round(i / 1023.0, 4) for i in range(1024))
+
+
 class VehicleStateBuilder:
     def __init__(self) -> None:
         self.seq: int = 0
         self.last_rx_ms: Optional[int] = None
         self.last_frame: Dict[str, Any] = {}
-        self.analog_state = defaultdict(lambda: {"smooth": None})
+
+        # Frame generation counter: build() skips the frame-derived part of
+        # the template when nothing new arrived since the last build
+        self._frame_gen: int = 0
+        self._built_gen: int = -1
+        # EMA smoothing state, one slot per _ANALOG_MAP channel
+        self._smooth_val: List[Optional[float]] = [None] * len(_ANALOG_MAP)
+
+        # IMPORTANT: Always include full schema (no partials). Every nested
+        # dict is allocated once here; build() only overwrites leaf values.
+        self._tmpl: Dict[str, Any] = {
+            "type": "vehicle_state",
+            "ts_ms": 0,
+            "source": "bbb_vehicle_hub",
+            "seq": 0,
+            "uptime_ms": 0,
+            "heartbeat": 0,
+            "indicators": {},
+            "warnings": {},
+            "spares": {},
+            "analog": {},
+            "_health": {
+                "stale": True,
+                "last_rx_ms": None,
+            },
+        }
+        for sect, key, _pin in _DIGITAL_MAP:
+            self._tmpl[sect][key] = False
+        for key, _pin in _ANALOG_MAP:
+            self._tmpl["analog"][key] = {"raw": None, "smooth": None, "norm": None}
+
+        # Resolve output slots once so build() writes straight into them
+        self._dig_slots = [
+            (self._tmpl[sect], key, pin) for sect, key, pin in _DIGITAL_MAP
+        ]
+        self._analog_slots = [
+            (self._tmpl["analog"][key], pin, i)
+            for i, (key, pin) in enumerate(_ANALOG_MAP)
+        ]
 
     def update_from_uno(self, frame: dict) -> None:
         """Call on every valid UNO vehicle_inputs frame."""
@@ -107,16 +226,26 @@ class VehicleStateBuilder:
         if isinstance(frame.get("seq"), int):
             self.seq = frame["seq"]
         self.last_frame = frame
+        self._frame_gen += 1
 
-    def _smooth(self, key: str, raw: float, alpha: float = 0.15) -> float:
-        state = self.analog_state[key]
-        if state["smooth"] is None:
-            state["smooth"] = raw
+    def _smooth(self, idx: int, raw: float, alpha: float = 0.15) -> float:
+        v = self._smooth_val[idx]
+        if v is None:
+            v = float(raw)
         else:
-            state["smooth"] = (alpha * raw) + ((1.0 - alpha) * state["smooth"])
-        return float(state["smooth"])
+            v = (alpha * raw) + ((1.0 - alpha) * v)
+        self._smooth_val[idx] = v
+        return v
 
     def build(self) -> Dict[str, Any]:
+        """
+        Refresh and return the long-lived vehicle_state dict.
+
+        The same dict is mutated in place on every call (no per-tick
+        allocation); serialize it before the next build(). Without a new
+        frame since the last call only ts_ms and _health are refreshed.
+        """
+        tmpl = self._tmpl
         ts = now_ms()
 
         stale = (
@@ -124,135 +253,154 @@ class VehicleStateBuilder:
             or (ts - self.last_rx_ms) > STALE_AFTER_MS
         )
 
+        tmpl["ts_ms"] = ts
+        health = tmpl["_health"]
+        health["stale"] = stale
+        health["last_rx_ms"] = self.last_rx_ms
+
+        if self._built_gen == self._frame_gen:
+            return tmpl
+
         frame = self.last_frame or {}
         inputs = frame.get("inputs") or {}
         analog = frame.get("analog") or {}
 
-        def d(pin: str) -> bool:
-            # Always return a bool, even if missing
-            return bool(inputs.get(pin, False))
+        tmpl["seq"] = self.seq
+        tmpl["uptime_ms"] = int(frame.get("uptime_ms", 0) or 0)
+        tmpl["heartbeat"] = int(frame.get("heartbeat", 0) or 0)
 
-        def a(name: str) -> Dict[str, Any]:
-            raw = analog.get(name, None)
+        # Always a bool, even if missing
+        for out, key, pin in self._dig_slots:
+            out[key] = bool(inputs.get(pin, False))
+
+        for out, pin, idx in self._analog_slots:
+            raw = analog.get(pin, None)
             if raw is None:
-                return {"raw": None, "smooth": None, "norm": None}
+                out["raw"] = out["smooth"] = out["norm"] = None
+                continue
             try:
                 raw_i = int(raw)
             except Exception:
-                return {"raw": None, "smooth": None, "norm": None}
+                out["raw"] = out["smooth"] = out["norm"] = None
+                continue
 
-            smooth = self._smooth(name, raw_i)
-            return {
-                "raw": raw_i,
-                "smooth": round(smooth, 2),
-                "norm": round(raw_i / 1023.0, 4),
-            }
+            smooth = self._smooth(idx, raw_i)
+            out["raw"] = raw_i
+            out["smooth"] = round(smooth, 2)
+            out["norm"] = (
+                _NORM_LUT[raw_i] if 0 <= raw_i < 1024 else round(raw_i / 1023.0, 4)
+            )
 
-        # IMPORTANT: Always include full schema (no partials)
-        return {
-            "type": "vehicle_state",
-            "ts_ms": ts,
-            "source": "bbb_vehicle_hub",
-            "seq": self.seq,
-            "uptime_ms": int(frame.get("uptime_ms", 0) or 0),
-            "heartbeat": int(frame.get("heartbeat", 0) or 0),
-
-            "indicators": {
-                "left": d("D2"),
-                "right": d("D3"),
-                "left_flashing": d("D2"),
-                "right_flashing": d("D3"),
-                "high_beam": d("D4"),
-            },
-
-            "warnings": {
-                "brake": d("D5"),
-                "oil": d("D6"),
-                "charge": d("D7"),
-                "door": d("D8"),
-            },
-
-            "spares": {
-                "spare_1": d("D9"),
-            },
-
-            "analog": {
-                "fuel_sender_raw": a("A0"),
-                "coolant_sender_raw": a("A1"),
-                "aux_analog_2": a("A2"),
-                "aux_analog_3": a("A3"),
-                "aux_analog_4": a("A4"),
-                "aux_analog_5": a("A5"),
-            },
-
-            "_health": {
-                "stale": stale,
-                "last_rx_ms": self.last_rx_ms,
-            },
-        }
+        self._built_gen = self._frame_gen
+        return tmpl
 
 
 # ----------------------------
-# Serial reader -> asyncio Queue
+# Serial reader (thread) -> asyncio Queue
 # ----------------------------
-async def serial_reader_task(q: asyncio.Queue, builder: VehicleStateBuilder) -> None:
-    port = _pick_serial_port()
-    log.info(f"Opening serial {port} @ {SERIAL_BAUD}")
-
+def _latest_vehicle_inputs(lines: list) -> Optional[Dict[str, Any]]:
+    """Return the newest valid vehicle_inputs frame among `lines`, if any."""
+    for line in reversed(lines):
+        line = line.strip()
+        if not line:
+            continue
+
+        # parse JSON straight from bytes (junk bytes just fail here)
+        try:
+            obj = _loads(line)
+        except Exception:
+            # ignore malformed lines
+            continue
+
+        # We only update builder on vehicle_inputs frames
+        if isinstance(obj, dict) and obj.get("type") == "vehicle_inputs":
+            return obj
+    return None
+
+
+def _offer_latest(frames: asyncio.Queue, obj: Dict[str, Any]) -> None:
+    """put_nowait that evicts the oldest entry when full (runs on the loop)."""
+    if frames.full():
+        frames.get_nowait()
+    frames.put_nowait(obj)
+
+
+def serial_reader_thread(loop: asyncio.AbstractEventLoop, frames: asyncio.Queue) -> None:
+    """
+    Blocking serial read + JSON parse, run in a dedicated thread so none of
+    it happens on the event loop. Parsed frames are handed over via
+    loop.call_soon_threadsafe.
+    """
+    port = None
+    failures = 0
     backoff = 0.25
     while True:
+        if failures >= SERIAL_RESCAN_AFTER:
+            _invalidate_serial_port()
+            failures = 0
+        if port != _pick_serial_port():
+            port = _pick_serial_port()
+            log.info("Opening serial %s @ %s", port, SERIAL_BAUD)
+
         try:
             with serial.Serial(port, SERIAL_BAUD, timeout=SERIAL_TIMEOUT_SEC) as ser:
-                log.info(f"Serial open OK ({port} @ {SERIAL_BAUD})")
+                log.info("Serial open OK (%s @ %s)", port, SERIAL_BAUD)
+                failures = 0
                 backoff = 0.25
 
+                buf = bytearray()
                 while True:
-                    line = await asyncio.to_thread(ser.readline)
-                    if not line:
+                    # Drain whatever is pending in one read (blocks for at
+                    # most SERIAL_TIMEOUT_SEC when idle)
+                    chunk = ser.read(ser.in_waiting or 1)
+                    if not chunk:
                         # timeout; just continue
-                        await asyncio.sleep(0)
                         continue
 
-                    # tolerate junk bytes
-                    try:
-                        s = line.decode("utf-8", errors="replace").strip()
-                    except Exception:
+                    buf += chunk
+                    *lines, rest = buf.split(b"\n")
+                    buf = bytearray(rest)
+                    if len(buf) > SERIAL_MAX_LINE_BYTES:
+                        # no newline in sight: junk, drop it
+                        buf.clear()
+
+                    # Only the newest frame matters (update_from_uno overwrites
+                    # last_frame), so parse from the end and stop at the first hit
+                    obj = _latest_vehicle_inputs(lines)
+                    if obj is None:
                         continue
 
-                    if not s:
-                        continue
-
-                    # parse JSON
-                    try:
-                        obj = json.loads(s)
-                    except Exception:
-                        # ignore malformed lines
-                        continue
-
-                    # We only update builder on vehicle_inputs frames
-                    if obj.get("type") == "vehicle_inputs":
-                        builder.update_from_uno(obj)
-
-                    # queue raw frames too (optional: can be useful for debugging)
-                    try:
-                        q.put_nowait(obj)
-                    except asyncio.QueueFull:
-                        # drop oldest behavior (simple)
-                        try:
-                            _ = q.get_nowait()
-                        except Exception:
-                            pass
-                        try:
-                            q.put_nowait(obj)
-                        except Exception:
-                            pass
+                    loop.call_soon_threadsafe(_offer_latest, frames, obj)
 
         except Exception as e:
-            log.warning(f"Serial error: {e} (retrying)")
-            await asyncio.sleep(backoff)
+            log.warning("Serial error: %s (retrying)", e)
+            failures += 1
+            time.sleep(backoff)
             backoff = min(backoff * 2.0, 5.0)
 
 
+async def serial_reader_task(hub: HubState) -> None:
+    # Bounded handoff from the reader thread; only already-parsed dicts
+    # ever reach the event loop
+    frames: asyncio.Queue = asyncio.Queue(maxsize=SERIAL_FRAME_QUEUE)
+    threading.Thread(
+        target=serial_reader_thread,
+        args=(asyncio.get_running_loop(), frames),
+        name="serial-reader",
+        daemon=True,
+    ).start()
+
+    while True:
+        obj = await frames.get()
+        # If we fell behind, skip straight to the newest frame
+        while not frames.empty():
+            obj = frames.get_nowait()
+
+        # Rebuild only when a new frame actually arrived
+        hub.builder.update_from_uno(obj)
+        hub.refresh()
+
+
 # ----------------------------
 # WebSocket server
 # ----------------------------
@@ -260,55 +408,95 @@ async def serial_reader_task(q: asyncio.Queue, builder: VehicleStateBuilder) ->
 class HubState:
     builder: VehicleStateBuilder
     latest_state: Dict[str, Any]
+    latest_payload: str  # latest_state serialized once per rebuild, shared by all clients
+    clients: Set[Any] = field(default_factory=set)
+
+    def refresh(self) -> None:
+        """Rebuild latest_state and its shared serialized payload."""
+        self.latest_state = self.builder.build()
+        self.latest_payload = _dumps(self.latest_state)
 
 
 async def ws_handler(ws, path, hub: HubState) -> None:
-    # Send hello immediately
-    await ws.send(json.dumps({
-        "type": "hello",
-        "service": "vehicle_hub",
-        "source": "bbb_vehicle_hub",
-        "ts_ms": now_ms(),
-    }))
-
-    # Then continuously push latest vehicle_state at the broadcast rate
     try:
-        while True:
-            await ws.send(json.dumps(hub.latest_state))
-            await asyncio.sleep(BROADCAST_INTERVAL)
+        # Send hello + current state immediately (don't wait for the next tick)
+        await ws.send(_dumps({
+            "type": "hello",
+            "service": "vehicle_hub",
+            "source": "bbb_vehicle_hub",
+            "ts_ms": now_ms(),
+        }))
+        await ws.send(hub.latest_payload)
     except Exception:
         # Client disconnected or network issue
         return
 
+    # From here on broadcast_pump pushes to us via websockets.broadcast()
+    hub.clients.add(ws)
+    try:
+        await ws.wait_closed()
+    finally:
+        hub.clients.discard(ws)
+
 
 async def main() -> None:
     # Builder + shared hub state
     builder = VehicleStateBuilder()
-    hub = HubState(builder=builder, latest_state=builder.build())
+    initial = builder.build()
+    hub = HubState(builder=builder, latest_state=initial, latest_payload=_dumps(initial))
 
-    # Serial queue (kept mainly for debugging / future expansion)
-    q: asyncio.Queue = asyncio.Queue(maxsize=200)
+    # Start serial reader (rebuilds latest_state on every new frame)
+    asyncio.create_task(serial_reader_task(hub))
 
-    # Start serial reader
-    asyncio.create_task(serial_reader_task(q, builder))
+    # Without frames nothing rebuilds, so wake up exactly when the last
+    # frame would go stale and refresh to flip _health.stale (then keep
+    # ts_ms moving while it stays stale). The stale-phase sleep is capped
+    # at STALE_AFTER_MS so a frame arriving meanwhile is still caught on time.
+    stale_sleep = min(STALE_CHECK_INTERVAL, STALE_AFTER_MS / 1000.0)
 
-    # Background task updates latest_state (always complete schema)
-    async def state_pump() -> None:
+    async def stale_watchdog() -> None:
+        while True:
+            last_rx = builder.last_rx_ms
+            if last_rx is not None:
+                remaining_ms = last_rx + STALE_AFTER_MS + 1 - now_ms()
+                if remaining_ms > 0:
+                    await asyncio.sleep(remaining_ms / 1000.0)
+                    continue
+            hub.refresh()
+            await asyncio.sleep(stale_sleep)
+
+    asyncio.create_task(stale_watchdog())
+
+    # Fan the latest payload out to every client in one synchronized tick
+    async def broadcast_pump() -> None:
+        last_warn = float("-inf")
         while True:
-            hub.latest_state = builder.build()
+            if hub.clients:
+                try:
+                    websockets.broadcast(hub.clients, hub.latest_payload)
+                except Exception as e:
+                    # Visible at the default level, but rate-limited: this
+                    # can fail on every tick and would flood the log
+                    t = time.monotonic()
+                    if t - last_warn >= BROADCAST_WARN_INTERVAL:
+                        last_warn = t
+                        log.warning("broadcast error: %s", e)
             await asyncio.sleep(BROADCAST_INTERVAL)
 
-    asyncio.create_task(state_pump())
+    asyncio.create_task(broadcast_pump())
 
     # Start WebSocket server
     server = await websockets.serve(
         lambda ws, path: ws_handler(ws, path, hub),
         WS_HOST,
         WS_PORT,
+        # vehicle_state is ~1KB: per-client permessage-deflate would compress
+        # the same payload N times per tick for little/no gain on the wire
+        compression=None,
     )
 
-    log.info(f"server listening on {WS_HOST}:{WS_PORT}")
-    log.info(f"WebSocket listening on ws://{WS_HOST}:{WS_PORT}")
+    log.info("server listening on %s:%s", WS_HOST, WS_PORT)
+    log.info("WebSocket listening on ws://%s:%s", WS_HOST, WS_PORT)
 
     # Run forever
     await asyncio.Future()
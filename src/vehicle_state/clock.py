@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+import time
+
+# One monotonic time base (ms since process start) shared by the hub,
+# the builders and the transformer so their timestamps are comparable
+START_NS = time.monotonic_ns()
+
+
+def now_ms() -> int:
+    return (time.monotonic_ns() - START_NS) // 1_000_000
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -50,21 +51,19 @@ class FlashDetector:
     min_toggles: int = 2
 
     _last: bool = False
-    _toggle_times_ms: list[int] = None
-
-    def __post_init__(self) -> None:
-        if self._toggle_times_ms is None:
-            self._toggle_times_ms = []
+    _toggle_times_ms: deque[int] = field(default_factory=deque)
 
     def update(self, value: bool, now_ms: int) -> bool:
+        toggles = self._toggle_times_ms
         if value != self._last:
             self._last = value
-            self._toggle_times_ms.append(now_ms)
+            toggles.append(now_ms)
 
         cutoff = now_ms - self.window_ms
-        # keep only toggles within window
-        self._toggle_times_ms = [t for t in self._toggle_times_ms if t >= cutoff]
-        return len(self._toggle_times_ms) >= self.min_toggles
+        # drop toggles that slid out of the window (oldest first)
+        while toggles and toggles[0] < cutoff:
+            toggles.popleft()
+        return len(toggles) >= self.min_toggles
 
 
 @dataclass
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-import time
 from dataclasses import dataclass
 from typing import Any
 
-from .mapping import PinMap, normalize_analog
+from . import clock
+from .mapping import AnalogMap, PinMap, normalize_analog
 from .stabilizers import HoldLatch, FlashDetector, EMA, OutlierClamp
 
 
@@ -20,9 +20,13 @@ class VehicleStateTransformer:
     _analog_clamp: dict[str, OutlierClamp] = None
     _analog_ema: dict[str, EMA] = None
 
+    # Loop-invariant per-pin iteration order (built once from the pinmap)
+    _dig_order: list[tuple[str, str, HoldLatch, FlashDetector | None]] = None
+    _analog_order: list[tuple[str, AnalogMap, OutlierClamp, EMA]] = None
+
     # Stale detection
     stale_timeout_ms: int = 1500
-    _last_frame_ms: int = 0
+    _last_frame_ms: int | None = None
 
     def __post_init__(self) -> None:
         self._dig_stab = {}
@@ -44,12 +48,22 @@ class VehicleStateTransformer:
             self._analog_clamp[amap.name] = OutlierClamp(max_step=120.0)
             self._analog_ema[amap.name] = EMA(alpha=0.25)
 
+        self._dig_order = [
+            (d_pin, name, self._dig_stab[name], self._flash.get(name))
+            for d_pin, name in self.pinmap.digital.items()
+        ]
+        self._analog_order = [
+            (a_pin, amap, self._analog_clamp[amap.name], self._analog_ema[amap.name])
+            for a_pin, amap in self.pinmap.analog.items()
+        ]
+
     def transform(self, frame: dict[str, Any]) -> dict[str, Any]:
         """
         Input: Arduino JSON frame {type:"vehicle_inputs", seq, uptime_ms, inputs:{D2..}, analog:{A0..}}
         Output: vehicle_state with stabilized digital + smoothed analog + metadata.
         """
-        now_ms = int(time.time() * 1000)
+        # One timestamp per frame, shared by every stabilizer
+        now_ms = clock.now_ms()
         self._last_frame_ms = now_ms
 
         raw_inputs: dict[str, bool] = dict(frame.get("inputs", {}) or {})
@@ -59,17 +73,17 @@ class VehicleStateTransformer:
         named_digital: dict[str, bool] = {}
         flashing: dict[str, bool] = {}
 
-        for d_pin, name in self.pinmap.digital.items():
+        for d_pin, name, stab, flash in self._dig_order:
             raw_val = bool(raw_inputs.get(d_pin, False))
-            stable = self._dig_stab[name].update(raw_val, now_ms)
+            stable = stab.update(raw_val, now_ms)
             named_digital[name] = stable
 
-            if name in self._flash:
-                flashing[name] = self._flash[name].update(stable, now_ms)
+            if flash is not None:
+                flashing[name] = flash.update(stable, now_ms)
 
         # ANALOG -> clamp + ema + normalize
         analog_out: dict[str, Any] = {}
-        for a_pin, amap in self.pinmap.analog.items():
+        for a_pin, amap, clamp, ema in self._analog_order:
             raw = raw_analog.get(a_pin, None)
             if raw is None:
                 continue
@@ -79,8 +93,8 @@ class VehicleStateTransformer:
             except Exception:
                 continue
 
-            clamped = self._analog_clamp[amap.name].update(raw_f)
-            smooth = self._analog_ema[amap.name].update(clamped)
+            clamped = clamp.update(raw_f)
+            smooth = ema.update(clamped)
             norm = normalize_analog(smooth, amap)
 
             analog_out[amap.name] = {
@@ -129,8 +143,11 @@ class VehicleStateTransformer:
         """
         Emits a minimal health state if serial stalls (so BeagleY can show 'No Data').
         """
-        now_ms = int(time.time() * 1000)
-        stale = (now_ms - self._last_frame_ms) > self.stale_timeout_ms if self._last_frame_ms else True
+        now_ms = clock.now_ms()
+        if self._last_frame_ms is None:
+            stale = True
+        else:
+            stale = (now_ms - self._last_frame_ms) > self.stale_timeout_ms
 
         return {
             "type": "vehicle_state",
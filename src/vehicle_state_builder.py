@@ -1,10 +1,6 @@
-import time
 from collections import defaultdict
 
-START_TS = time.monotonic()
-
-def now_ms():
-    return int((time.monotonic() - START_TS) * 1000)
+from vehicle_state.clock import now_ms
 
 
 class VehicleStateBuilder:
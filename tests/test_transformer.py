@@ -0,0 +1,72 @@
+import random
+from pathlib import Path
+
+import vehicle_state.clock as clock
+import vehicle_state.transformer as transformer
+from vehicle_state.mapping import load_pinmap
+from vehicle_state.stabilizers import FlashDetector, HoldLatch
+
+PINMAP = Path(__file__).resolve().parents[1] / "src" / "config" / "pinmap.json"
+
+# vehicle_state field for each pinmap signal name
+DIGITAL_FIELDS = {
+    "left_indicator": ("indicators", "left"),
+    "right_indicator": ("indicators", "right"),
+    "high_beam": ("indicators", "high_beam"),
+    "brake_warning": ("warnings", "brake"),
+    "oil_pressure": ("warnings", "oil"),
+    "charge_lamp": ("warnings", "charge"),
+    "door_ajar": ("warnings", "door"),
+    "spare_1": ("spares", "spare_1"),
+}
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.ms = 1_000_000
+
+    def now_ms(self) -> int:
+        return self.ms
+
+
+def test_hold_latch_holds_on_through_brief_dropout():
+    latch = HoldLatch(min_stable_ms=30, hold_on_ms=80)
+    assert latch.update(True, 0) is False
+    assert latch.update(True, 30) is True
+    # raw drops out, but hold_on keeps it ON until 30 + 80
+    assert latch.update(False, 40) is True
+    assert latch.update(False, 100) is True
+    assert latch.update(False, 111) is False
+
+
+def test_transform_digital_matches_per_signal_stabilizers(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(clock, "now_ms", fake.now_ms)
+
+    pinmap = load_pinmap(str(PINMAP))
+    tr = transformer.VehicleStateTransformer(pinmap)
+
+    # Independent reference stabilizers, configured like the transformer
+    indicators = ("left_indicator", "right_indicator")
+    latches = {
+        name: HoldLatch(min_stable_ms=30, hold_on_ms=80 if name in indicators else 0)
+        for name in pinmap.digital.values()
+    }
+    flashes = {name: FlashDetector(window_ms=1200, min_toggles=2) for name in indicators}
+
+    rnd = random.Random(0)
+    for _ in range(2000):
+        fake.ms += rnd.choice([5, 10, 20, 40, 100])
+        inputs = {pin: rnd.random() < 0.5 for pin in pinmap.digital if rnd.random() < 0.9}
+        state = tr.transform({"type": "vehicle_inputs", "inputs": inputs, "analog": {}})
+
+        for pin, name in pinmap.digital.items():
+            expected = latches[name].update(bool(inputs.get(pin, False)), fake.ms)
+            section, key = DIGITAL_FIELDS[name]
+            assert state[section][key] is expected
+
+            if name in flashes:
+                side = "left" if name == "left_indicator" else "right"
+                assert state["indicators"][f"{side}_flashing"] is flashes[name].update(
+                    expected, fake.ms
+                )